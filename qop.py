@@ -46,6 +46,7 @@ for p in [parser_copy, parser_convert, parser_move]:
     g = p.add_mutually_exclusive_group()
     g.add_argument("-i", "--include", nargs="+", type=str, help="keep only files with these extensions")
     g.add_argument("-I", "--exclude", nargs="+", type=str, help="keep only files that do not have these extensions")
+    p.add_argument("-x", "--skip-dirs", nargs="+", type=str, help="do not descend into directories with these names (for example .git node_modules). Requires --include or --exclude for copy and move.")
 
 # re
 parser_re = subparsers.add_parser("re", help="repeat the last copy/convert/move operation on different source paths")
@@ -70,6 +71,7 @@ parser_queue_sub.add_parser("start", help="start processing the queue").set_defa
 parser_queue_sub.add_parser("stop",  help="stop processing the queue").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_STOP)
 parser_queue_sub.add_parser("flush", help="completely reset the queue (including finished, failed and skipped tasks)").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_FLUSH_ALL)
 parser_queue_sub.add_parser("flush-pending", help="remove all pending tasks from the queue").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_FLUSH_PENDING)
+parser_queue_sub.add_parser("archive", help="move finished, failed and skipped tasks out of the queue").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_ARCHIVE)
 parser_queue_sub.add_parser("progress", help="show interactive progress bar").set_defaults(fun=_cli.handle_queue_progress)
 parser_queue_sub.add_parser("active", help="show number of active queues (usually just one)").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_ACTIVE_PROCESSES)
 parser_queue_sub.add_parser("is-active", help="show number of active queues (usually just one)").set_defaults(fun=_cli.handle_simple_command, command=Command.QUEUE_IS_ACTIVE)
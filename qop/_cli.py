@@ -21,6 +21,9 @@ from qop.constants import Status, Command, PayloadClass
 init()  # init terminal colors
 lg = logging.getLogger(__name__)
 
+#: number of tasks that `qop copy/convert/move` sends to the daemon at once
+ENQUEUE_BATCH_SIZE = 500
+
 # ANSI Escapes
 CPL = "\033[A"  # ANSI move cursor previous line
 EL = "\033[K"   # ANSI erase line
@@ -62,6 +65,12 @@ def handle_copy_convert_move(args, client) -> Dict:
     assert len(sources) > 0
     assert sources != dst_dir
 
+    # nothing is skipped unless requested, so that all transfers copy the same files whether or not they are filtered
+    skip_dirs = getattr(args, "skip_dirs", None) or ()
+    is_scanning = args.include is not None or args.exclude is not None or args.mode == "convert"
+    if skip_dirs and not is_scanning:
+        return {"status": Status.FAIL, "msg": "--skip-dirs requires --include or --exclude when copying or moving"}
+
     # for use by `qop re`
     args_cache = Path(appdirs.user_cache_dir('qop')).joinpath('last_args.pickle')
     if args_cache.exists():
@@ -72,11 +81,11 @@ def handle_copy_convert_move(args, client) -> Dict:
 
     # setup scanner
     if args.include is not None:
-        scanner = scanners.IncludeScanner(args.include)
+        scanner = scanners.Scanner(include=args.include, skip_dirs=skip_dirs)
     elif args.exclude is not None:
-        scanner = scanners.ExcludeScanner(args.exclude)
+        scanner = scanners.Scanner(exclude=args.exclude, skip_dirs=skip_dirs)
     elif args.mode == "convert":
-        scanner = scanners.Scanner()
+        scanner = scanners.Scanner(skip_dirs=skip_dirs)
     else:
         scanner = scanners.PassScanner()
 
@@ -87,10 +96,10 @@ def handle_copy_convert_move(args, client) -> Dict:
 
         if args.convert_only is not None:
             conv_mode = "include"
-            conv_exts = ["." + e for e in args.convert_only]
+            conv_exts = frozenset("." + e.lower() for e in args.convert_only)
         elif args.convert_not is not None:
             conv_mode = "exclude"
-            conv_exts = ["." + e for e in args.convert_not]
+            conv_exts = frozenset("." + e.lower() for e in args.convert_not)
         elif args.convert_none:
             conv_mode = "none"
             conv_exts = None
@@ -103,47 +112,62 @@ def handle_copy_convert_move(args, client) -> Dict:
         conv = None
         conv_copy = None
 
-    for source in sources:
-        root = Path(source).resolve().parent
-        children = scanner.scan(source)
-
-        for src in children:
-            lg.debug(f"inserting {src}")
-            src = Path(src).resolve()
-            dst = Path(dst_dir).resolve().joinpath(src.relative_to(root))
-
-            # setup convert task
-            if args.mode == "convert":
-                if conv_mode == "all":
-                    dst = dst.with_suffix("." + conv.ext)
-                    tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
-                elif conv_mode == "include" and src.suffix in conv_exts:
-                    dst = dst.with_suffix("." + conv.ext)
-                    tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
-                elif conv_mode == "exclude" and src.suffix not in conv_exts:
-                    dst = dst.with_suffix("." + conv.ext)
-                    tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
-                elif args.remove_art:
-                    tsk = tasks.SimpleConvertTask(src=src, dst=dst, converter=conv_copy)
-                else:
-                    tsk = tasks.CopyTask(src=src, dst=dst)
-            elif args.mode == "move":
-                tsk = tasks.MoveTask(src=src, dst=dst)
-            elif args.mode == "copy":
-                tsk = tasks.CopyTask(src=src, dst=dst)
+    def enqueue(batch):
+        nonlocal is_queue_active
+        rsp = client.send_command(Command.QUEUE_PUT_MANY, payload=[tsk.to_dict() for tsk in batch])
+
+        if not is_queue_active and not args.enqueue_only:
+            client.send_command(Command.QUEUE_START)
+            is_queue_active = True
+
+        if args.verbose:
+            for x in rsp.get('payload', ()):
+                print(format_response(x))
+
+        print(format_response_summary(client.stats), end="\r")
+
+    # scan_all() resolves each source only once and skips duplicates, as they would be enqueued with identical
+    # destinations
+    batch = []
+    for source, src in scanner.scan_all(sources):
+        lg.debug(f"inserting {src}")
+        src = Path(src)
+        dst = dst_dir.joinpath(src.relative_to(source.parent))
+
+        # setup convert task
+        if args.mode == "convert":
+            if conv_exts is not None:
+                name = src.name
+                dot = name.rfind(".")
+                ext = name[dot:].lower() if dot > 0 else ""
+
+            if conv_mode == "all":
+                dst = dst.with_suffix("." + conv.ext)
+                tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
+            elif conv_mode == "include" and ext in conv_exts:
+                dst = dst.with_suffix("." + conv.ext)
+                tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
+            elif conv_mode == "exclude" and ext not in conv_exts:
+                dst = dst.with_suffix("." + conv.ext)
+                tsk = tasks.ConvertTask(src=src, dst=dst, converter=conv)
+            elif args.remove_art:
+                tsk = tasks.SimpleConvertTask(src=src, dst=dst, converter=conv_copy)
             else:
-                raise ValueError
-
-            rsp = client.send_command(Command.QUEUE_PUT, payload=tsk)
-
-            if not is_queue_active and not args.enqueue_only:
-                client.send_command(Command.QUEUE_START)
-                is_queue_active = True
+                tsk = tasks.CopyTask(src=src, dst=dst)
+        elif args.mode == "move":
+            tsk = tasks.MoveTask(src=src, dst=dst)
+        elif args.mode == "copy":
+            tsk = tasks.CopyTask(src=src, dst=dst)
+        else:
+            raise ValueError
 
-            if args.verbose:
-                print(format_response(rsp))
+        batch.append(tsk)
+        if len(batch) >= ENQUEUE_BATCH_SIZE:
+            enqueue(batch)
+            batch = []
 
-            print(format_response_summary(client.stats), end="\r")
+    if batch:
+        enqueue(batch)
 
     if not args.enqueue_only:
         client.send_command(Command.QUEUE_START)
@@ -266,6 +290,8 @@ def format_response(rsp) -> str:
             res = res + tasks.Task.from_dict(payload).color_repr() + " "
         elif plc == PayloadClass.TASK_LIST:
             res = "\n".join([tasks.Task.from_dict(x['task']).color_repr() for x in payload]) + "\n\n" + res
+        elif plc == PayloadClass.STATUS_LIST:
+            res = "\n".join([format_response(x) for x in payload]) + "\n\n" + res
         else:
             res = res + '\n' + json.dumps(payload, indent=4)
 
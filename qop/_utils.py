@@ -4,18 +4,51 @@ Internal utility functions
 
 from qop import constants
 from pathlib import Path
+import os
+import stat
+import errno
+import functools
+import time
 import socket
 import shutil
+from typing import Optional
 
 from mediafile import MediaFile
 from qop.constants import Pathish
 
 
+#: Number of seconds for which the results of :func:`resolve_path` are cached
+RESOLVE_CACHE_TTL = 60
+
+
 def get_project_root(*args) -> Path:
     """Returns project root folder."""
     return Path(__file__).parent.parent.joinpath(*args).resolve()
 
 
+def resolve_path(path: Pathish) -> Path:
+    """Like `Path(path).resolve()`, but results are cached for up to `RESOLVE_CACHE_TTL` seconds"""
+    path = os.fspath(path)
+    cwd = "" if os.path.isabs(path) else os.getcwd()
+    return _resolve_cached(cwd, path, int(time.monotonic() // RESOLVE_CACHE_TTL))
+
+
+@functools.lru_cache(maxsize=8192)
+def _resolve_cached(cwd: str, path: str, ttl_bucket: int) -> Path:
+    return Path(cwd, path).resolve()
+
+
+def resolve_file(path: Pathish) -> Path:
+    """
+    Like `Path(path).resolve()`, but only the parent directory is fully resolved (via :func:`resolve_path`), so that
+    resolving many files in the same directory only costs a single `lstat()` per file.
+    """
+    path = Path(path)
+    if path.name in ("", ".", "..") or path.is_symlink():
+        return path.resolve()
+    return resolve_path(path.parent).joinpath(path.name)
+
+
 def is_daemon_active(ip: str, port: int):
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client:
@@ -42,8 +75,103 @@ def transfer_tags(src: Pathish, dst: Pathish, remove_art: bool = False) -> None:
     g.save()
 
 
-def purge_convert_cache():
-    try:
-        shutil.rmtree(constants.CONVERT_CACHE_DIR)
-    except:
-        pass
+def files_identical(a: Pathish, b: Pathish, chunk_size: int = 1024 * 1024) -> bool:
+    """
+    Check whether two regular files have the same content. Like :func:`filecmp.cmp`, files with the same size and
+    modification time are considered identical without reading them, but the contents are compared in large chunks
+    and the result is not cached.
+
+    :param a: path to a file
+    :param b: path to a file
+    :param chunk_size: number of bytes to read at once when the contents have to be compared
+    """
+    sa = os.stat(a)
+    sb = os.stat(b)
+
+    if not (stat.S_ISREG(sa.st_mode) and stat.S_ISREG(sb.st_mode)):
+        return False
+    if sa.st_size != sb.st_size:
+        return False
+    if sa.st_mtime_ns == sb.st_mtime_ns:
+        return True
+
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            ca = fa.read(chunk_size)
+            if ca != fb.read(chunk_size):
+                return False
+            if not ca:
+                return True
+
+
+def copy_file(src: Pathish, dst: Pathish, preserve_stat: bool = False) -> None:
+    """
+    Copy the contents of the file `src` to the file `dst`. Uses :func:`os.copy_file_range` where available, which
+    copies in the kernel (or just creates a reflink on copy-on-write filesystems such as Btrfs or XFS). Falls back to
+    :func:`shutil.copyfile`, which uses `sendfile` on Linux.
+
+    :param src: source file
+    :param dst: destination file (not a directory)
+    :param preserve_stat: if `True`, copy all metadata like :func:`shutil.copy2`, otherwise only the permission bits
+        like :func:`shutil.copy`
+    """
+    copied = False
+    if hasattr(os, "copy_file_range"):
+        # like shutil.copyfile, and before dst is truncated by opening it
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                n_bytes = 0
+                while True:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1024 * 1024 * 1024)
+                    if n == 0:
+                        break
+                    n_bytes += n
+                # some filesystems (procfs-like, some FUSE and network mounts) report end of file without copying
+                # anything, just like CPython's shutil guards against
+                copied = n_bytes > 0 or os.fstat(fsrc.fileno()).st_size == 0
+        except OSError as e:
+            # not supported by the kernel or between these filesystems
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ETXTBSY):
+                raise
+
+    if not copied:
+        shutil.copyfile(src, dst)
+
+    if preserve_stat:
+        shutil.copystat(src, dst)
+    else:
+        shutil.copymode(src, dst)
+
+
+def copy_file_with_stat(src: Pathish, dst: Pathish) -> None:
+    """:func:`copy_file` with `preserve_stat=True`; for use as `copy_function` in :mod:`shutil`"""
+    copy_file(src, dst, preserve_stat=True)
+
+
+def purge_convert_cache(min_age: Optional[float] = None) -> None:
+    """
+    Purge the temporary directory used by :class:`~qop.tasks.ConvertTask`
+
+    :param min_age: If `None` remove the whole directory. Otherwise only remove files whose last modification lies at
+        least `min_age` seconds in the past, so that the files of conversions that are still running (or whose
+        follow-up :class:`~qop.tasks.MoveTask` is still pending) are left alone.
+    """
+    if min_age is None:
+        try:
+            shutil.rmtree(constants.CONVERT_CACHE_DIR)
+        except:
+            pass
+        return
+
+    cutoff = time.time() - min_age
+    for root, dirs, files in os.walk(constants.CONVERT_CACHE_DIR):
+        for f in files:
+            try:
+                p = os.path.join(root, f)
+                if os.stat(p).st_mtime < cutoff:
+                    os.unlink(p)
+            except OSError:
+                pass
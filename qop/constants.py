@@ -40,6 +40,8 @@ class Command(IntEnum):
     QUEUE_ACTIVE_PROCESSES = 208
     QUEUE_SHOW = 209
     QUEUE_MAX_PROCESSES = 210
+    QUEUE_PUT_MANY = 211
+    QUEUE_ARCHIVE = 212
 
 
 class PayloadClass(IntEnum):
@@ -51,6 +53,7 @@ class PayloadClass(IntEnum):
     QUEUE_PROGRESS = 3
     TASK_LIST = 4
     DAEMON_FACTS = 5
+    STATUS_LIST = 6  # a list of StatusMessage bodies, one for each Task sent with QUEUE_PUT_MANY
 
 
 class Status(IntEnum):
@@ -84,8 +84,7 @@ class CopyConverter(Converter):
     def start(self, src: Pathish, dst: Pathish):
         src = Path(src).resolve()
         dst = Path(dst).resolve()
-        if not dst.parent.exists():
-            dst.parent.mkdir(parents=True)
+        dst.parent.mkdir(parents=True, exist_ok=True)
 
         shutil.copy(src, dst)
         if self.remove_art:
@@ -130,8 +129,7 @@ class PydubConverter(CopyConverter):
     def start(self, src: Union[Path, str], dst: Union[Path, str]) -> None:
         src = Path(src).resolve()
         dst = Path(dst).resolve()
-        if not dst.parent.exists():
-            dst.parent.mkdir(parents=True)
+        dst.parent.mkdir(parents=True, exist_ok=True)
 
         x = pydub.AudioSegment.from_file(src)
         x.export(
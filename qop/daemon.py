@@ -82,6 +82,8 @@ class QopDaemon:
         except:
             pass
 
+        # closing the last connection also removes the -wal and -shm files of the queue
+        self.queue.close()
         if not self.persist_queue:
             self.queue.path.unlink()
 
@@ -96,8 +98,9 @@ class QopDaemon:
         while True:
             client, address = self._socket.accept()
             lg.debug(f'client connected: {address}')
-            req = client.recv(1024)
-            lg.debug(f"processing request {req}")
+            req = recv_message(client)
+            if lg.isEnabledFor(logging.DEBUG):
+                lg.debug(f"processing request {req}")
 
             if self.queue.is_active():
                 if len(self.queue.convert_processes) < self.queue.max_convert_processes:
@@ -174,6 +177,10 @@ class QopDaemon:
                     self.queue.flush()
                     client.sendall(StatusMessage(Status.OK, "flushed queue").encode())
 
+                elif command == Command.QUEUE_ARCHIVE:
+                    n = self.queue.archive()
+                    client.sendall(StatusMessage(Status.OK, f"archived {n} finished tasks").encode())
+
                 elif command == Command.QUEUE_FLUSH_PENDING:
                     self.queue.flush(status=Status.PENDING)
                     client.sendall(StatusMessage(Status.OK, "flushed pending tasks from queue").encode())
@@ -184,23 +191,24 @@ class QopDaemon:
 
                 elif dd.body['command'] == Command.QUEUE_PUT:
                     tsk = tasks.Task.from_dict(dd.body['payload'])
-                    try:
-                        tsk.__validate__()
+                    rsp = self.validate_task(tsk)
+                    if rsp.body['status'] == Status.OK:
                         self.queue.put(tsk)
-                        lg.debug(f"enqueued task {tsk}")
-                        client.sendall(StatusMessage(Status.OK, payload=tsk, payload_class=PayloadClass.TASK).encode())
-                    except FileExistsAndShouldBeSkippedError:
-                        msg = f"destination exists"
-                        lg.debug(msg)
-                        client.sendall(StatusMessage(Status.SKIP, msg=msg, payload=tsk, payload_class=PayloadClass.TASK).encode())
-                    except FileExistsError:
-                        msg = f"destination exists and differs from source"
-                        lg.error(msg)
-                        client.sendall(StatusMessage(Status.FAIL, msg=msg, payload=tsk, payload_class=PayloadClass.TASK).encode())
-                    except:
-                        msg = str(sys.exc_info())
-                        lg.error(msg)
-                        client.sendall(StatusMessage(Status.FAIL, msg=msg, payload=tsk, payload_class=PayloadClass.TASK).encode())
+                        if lg.isEnabledFor(logging.DEBUG):
+                            lg.debug(f"enqueued task {tsk}")
+                    client.sendall(rsp.encode())
+
+                elif dd.body['command'] == Command.QUEUE_PUT_MANY:
+                    tsks = [tasks.Task.from_dict(x) for x in dd.body['payload']]
+                    rsps = [self.validate_task(tsk) for tsk in tsks]
+                    self.queue.put_many([tsk for tsk, rsp in zip(tsks, rsps) if rsp.body['status'] == Status.OK])
+                    lg.debug(f"enqueued {len(tsks)} tasks")
+                    client.sendall(StatusMessage(
+                        Status.OK,
+                        f"processed {len(tsks)} tasks",
+                        payload=[rsp.body for rsp in rsps],
+                        payload_class=PayloadClass.STATUS_LIST
+                    ).encode())
                 else:
                     msg = f"unknown command {dd.body['command']}"
                     lg.error(msg)
@@ -212,6 +220,29 @@ class QopDaemon:
                 lg.error(info, exc_info=info)
                 client.sendall(StatusMessage(Status.FAIL, msg=str(info[0]) + str(info[1])).encode())
 
+    @staticmethod
+    def validate_task(tsk: tasks.Task) -> "StatusMessage":
+        """
+        Validate a Task before it is enqueued
+
+        :return: the StatusMessage to send to the client. The task should only be enqueued if its status is *ok*.
+        """
+        try:
+            tsk.__validate__()
+            return StatusMessage(Status.OK, payload=tsk, payload_class=PayloadClass.TASK)
+        except FileExistsAndShouldBeSkippedError:
+            msg = f"destination exists"
+            lg.debug(msg)
+            return StatusMessage(Status.SKIP, msg=msg, payload=tsk, payload_class=PayloadClass.TASK)
+        except FileExistsError:
+            msg = f"destination exists and differs from source"
+            lg.error(msg)
+            return StatusMessage(Status.FAIL, msg=msg, payload=tsk, payload_class=PayloadClass.TASK)
+        except:
+            msg = str(sys.exc_info())
+            lg.error(msg)
+            return StatusMessage(Status.FAIL, msg=msg, payload=tsk, payload_class=PayloadClass.TASK)
+
     @staticmethod
     def handle_request(req):
         return Message.from_bytes(req)
@@ -304,19 +335,25 @@ class QopClient:
             client.connect((self.ip, self.port))
             req = CommandMessage(command, payload=payload)
             client.sendall(req.encode())
-            res = Message.from_bytes(client.recv(2048)).body
+            res = Message.from_bytes(recv_message(client)).body
 
             # track enqueued tasks of this client
             if command == Command.QUEUE_PUT:
-                if res['status'] == Status.OK:
-                    self.stats['ok'] = self.stats['ok'] + 1
-                if res['status'] == Status.SKIP:
-                    self.stats['skip'] = self.stats['skip'] + 1
-                if res['status'] == Status.FAIL:
-                    self.stats['fail'] = self.stats['fail'] + 1
+                self._track(res)
+            elif command == Command.QUEUE_PUT_MANY:
+                for x in res.get('payload', ()):
+                    self._track(x)
 
             return res
 
+    def _track(self, res: Dict) -> None:
+        if res['status'] == Status.OK:
+            self.stats['ok'] = self.stats['ok'] + 1
+        if res['status'] == Status.SKIP:
+            self.stats['skip'] = self.stats['skip'] + 1
+        if res['status'] == Status.FAIL:
+            self.stats['fail'] = self.stats['fail'] + 1
+
 
 class Message:
     """Container for messages sent between :class:`~qop.daemon.QopDaemon` and :class:`~qop.daemon.QopClient`."""
@@ -343,13 +380,15 @@ class Message:
         header = bytes(json.dumps(header), "utf-8")
         header_len: bytes = struct.pack("!H", len(header))  # network-endianess, unsigned long integer (4 bytes)
 
-        lg.debug(f'encoding message {body} with header_length={int(struct.unpack("!H", header_len)[0])} and content_length={len(body)}')
+        if lg.isEnabledFor(logging.DEBUG):
+            lg.debug(f'encoding message {body} with header_length={int(struct.unpack("!H", header_len)[0])} and content_length={len(body)}')
         return header_len + header + body
 
 
     @staticmethod
     def from_bytes(x: bytes) -> "Message":
-        logging.getLogger("qop.daemon").debug(f"decoding message '{x}'")
+        if lg.isEnabledFor(logging.DEBUG):
+            lg.debug(f"decoding message '{x}'")
 
         header_len = int(struct.unpack("!H", x[:PREHEADER_LEN])[0])
         raw_header = x[PREHEADER_LEN:(header_len + PREHEADER_LEN)]
@@ -437,3 +476,30 @@ class CommandMessage(Message):
             body=body,
             extra_headers={"message-class": "CommandMessage"}
         )
+
+
+def recv_message(sock: socket.socket) -> bytes:
+    """
+    Receive a complete encoded :class:`~qop.daemon.Message` from `sock`, no matter how many `recv()` calls this takes
+
+    :return: the raw message that can be decoded with :func:`Message.from_bytes`. Empty if the peer closed the
+        connection without sending anything.
+    """
+    preheader = _recv_exactly(sock, PREHEADER_LEN)
+    if not preheader:
+        return preheader
+
+    raw_header = _recv_exactly(sock, int(struct.unpack("!H", preheader)[0]))
+    content_length = json.loads(raw_header.decode("utf-8"))["content-length"]
+    return preheader + raw_header + _recv_exactly(sock, content_length)
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 65536))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n = n - len(chunk)
+    return b"".join(chunks)
@@ -7,6 +7,11 @@ class AlreadyUnderEvaluationError(Exception):
     pass
 
 
+class QueueEmptyError(IndexError):
+    """There are no (pending) tasks in the queue"""
+    pass
+
+
 class FileExistsAndShouldBeSkippedError(Exception):
     pass
 
@@ -1,63 +1,134 @@
 """
-Used by qop.py to traverse the directory tree when looking for files to transfer
+Used by qop.py to traverse the directory tree when looking for files to transfer. All filtering is implemented in
+:class:`~qop.scanners.Scanner`; the subclasses only exist as shortcuts for common configurations.
 """
 
 
+import os
 from pathlib import Path
 from qop.constants import Pathish
+from qop import _utils
 import logging
-from typing import Generator
+import re
+from typing import Generator, List, Iterable, Tuple, Optional
+
+lg = logging.getLogger(__name__)
+
+
+#: Names of directories that scanners do not descend into by default
+SKIP_DIRS = frozenset({".git", "node_modules", "__pycache__", ".svn", "@eaDir"})
 
 
 class Scanner:
-    def __init__(self) -> None:
-        pass
+    def __init__(
+            self,
+            include: Optional[List[str]] = None,
+            exclude: Optional[List[str]] = None,
+            skip_dirs: Iterable[str] = SKIP_DIRS
+    ) -> None:
+        """
+        :param include: only yield files with these extensions (without leading dot, case-insensitive)
+        :param exclude: only yield files without these extensions. Cannot be combined with `include`.
+        :param skip_dirs: names of directories that are skipped (together with their contents) when scanning
+        """
+        if include is not None and exclude is not None:
+            raise ValueError("cannot specify `include` and `exclude` at the same time")
+
+        self.include = include
+        self.exclude = exclude
+        self.skip_dirs = frozenset(skip_dirs)
+
+        # the strategy for filtering file names is chosen once here, so that scan() only has to make a single call
+        # per entry
+        if include is not None:
+            self._accept = _compile_ext_re(include).search
+        elif exclude is not None:
+            self._accept = _compile_ext_re(exclude, negate=True).match
+        else:
+            self._accept = None
+
+    def scan(self, root: Pathish) -> Generator[str, None, None]:
+        root = _utils.resolve_path(root)
+        accept = self._accept
+
+        if lg.isEnabledFor(logging.DEBUG):
+            if self.include is not None:
+                lg.debug(f"collecting files with extensions {','.join(self.include)}")
+            elif self.exclude is not None:
+                lg.debug(f"collecting files without extensions {','.join(self.exclude)}")
 
-    def scan(self, root: Pathish) -> Generator[Path, None, None]:
-        root = Path(root).resolve()
         if not root.is_dir():
-            yield root
+            if accept is None or accept(root.name):
+                yield str(root)
+        elif accept is None:
+            for dirpath, name in self._walk(root):
+                yield os.path.join(dirpath, name)
         else:
-            for p in root.rglob("*"):
-                yield p.resolve()
+            for dirpath, name in self._walk(root):
+                if accept(name):
+                    yield os.path.join(dirpath, name)
+
+    def scan_all(self, roots: Iterable[Pathish]) -> Generator[Tuple[Path, str], None, None]:
+        """
+        Scan several roots one after another. Each root is only resolved once it is reached, and roots that were
+        already scanned are skipped.
+
+        :return: `(root, path)` tuples, where `root` is the resolved root that `path` was found in
+        """
+        seen = set()
+        for root in roots:
+            root = _utils.resolve_path(root)
+            if root in seen:
+                continue
+            seen.add(root)
+
+            for p in self.scan(root):
+                yield root, p
+
+    def _walk(self, root: Path) -> Generator[Tuple[str, str], None, None]:
+        """
+        Recursively yield `(dirpath, name)` for all entries below `root`. Directories in `skip_dirs` are pruned before
+        descending into them, symlinks to directories are not followed (like :meth:`pathlib.Path.rglob`), and
+        directories that cannot be read are skipped.
+        """
+        for dirpath, dirnames, filenames in os.walk(root, followlinks=False):
+            if self.skip_dirs and not self.skip_dirs.isdisjoint(dirnames):
+                for d in self.skip_dirs.intersection(dirnames):
+                    lg.info(f"skipping directory {os.path.join(dirpath, d)}")
+                dirnames[:] = [d for d in dirnames if d not in self.skip_dirs]
+            for name in dirnames:
+                yield dirpath, name
+            for name in filenames:
+                yield dirpath, name
 
 
 class PassScanner(Scanner):
-    def scan(self, root: Pathish) -> Generator[Path, None, None]:
-        yield Path(root).resolve()
+    """Scanner that does not traverse directories but yields the (resolved) root itself"""
+    def scan(self, root: Pathish) -> Generator[str, None, None]:
+        yield str(_utils.resolve_path(root))
 
 
 class ExcludeScanner(Scanner):
-    def __init__(self, exts: list) -> None:
+    """Shortcut for `Scanner(exclude=exts)`"""
+    def __init__(self, exts: list, skip_dirs: Iterable[str] = SKIP_DIRS) -> None:
+        super().__init__(exclude=exts, skip_dirs=skip_dirs)
         self.exts = exts
 
-    def scan(self, root: Pathish) -> Generator[Path, None, None]:
-        root = Path(root).resolve()
-        logging.getLogger("qop.scanners").debug(f"collecting files without extensions {','.join(self.exts)}")
-        exts = ["." + e for e in self.exts]
-
-        if not root.is_dir():
-            if root.suffix not in exts:
-                yield root
-        else:
-            for p in root.rglob("*"):
-                if p.suffix not in exts:
-                    yield p.resolve()
-
 
 class IncludeScanner(Scanner):
-    def __init__(self, exts: list) -> None:
+    """Shortcut for `Scanner(include=exts)`"""
+    def __init__(self, exts: list, skip_dirs: Iterable[str] = SKIP_DIRS) -> None:
+        super().__init__(include=exts, skip_dirs=skip_dirs)
         self.exts = exts
 
-    def scan(self, root: Pathish) -> Generator[Path, None, None]:
-        root = Path(root).resolve()
-        logging.getLogger("qop.scanners").debug(f"collecting files with extensions {','.join(self.exts)}")
-        exts = ["." + e for e in self.exts]
 
-        if not root.is_dir():
-            if root.suffix in exts:
-                yield root
-        else:
-            for p in root.rglob("*"):
-                if p.suffix in exts:
-                    yield p.resolve()
+def _compile_ext_re(exts: list, negate: bool = False) -> "re.Pattern":
+    """
+    Compile a case-insensitive regex that matches file names ending in any of `exts` (without leading dot). If
+    `negate` is `True`, the regex matches (via `.match()`) all file names that do *not* end in any of `exts`.
+    """
+    alternatives = "|".join(re.escape(e) for e in exts)
+    if negate:
+        return re.compile(r"(?!.*\.(?:" + alternatives + r")\Z)", re.IGNORECASE | re.DOTALL)
+    else:
+        return re.compile(r"\.(?:" + alternatives + r")\Z", re.IGNORECASE)
@@ -11,19 +11,25 @@ store and execute an arbitrary number of tasks.
 
 import shutil
 import os
+import stat
 import json
 import sqlite3
 import uuid
-import filecmp
 import multiprocessing
 import logging
 from pathlib import Path
-from typing import Union, Optional, Dict, Tuple, List
-from time import sleep
+from typing import Union, Optional, Dict, Tuple, List, Iterable, Iterator
+from time import sleep, monotonic
 from colorama import init, Fore
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from qop.constants import Status, TaskType, Pathish, CONVERT_CACHE_DIR
-from qop.exceptions import AlreadyUnderEvaluationError, FileExistsAndIsIdenticalError, FileExistsAndCannotBeComparedError
+from qop.exceptions import AlreadyUnderEvaluationError, FileExistsAndIsIdenticalError, FileExistsAndCannotBeComparedError, \
+    QueueEmptyError
 from qop import converters, _utils
 
 
@@ -31,6 +37,41 @@ init()
 
 lg = logging.getLogger(__name__)
 
+#: `UPDATE ... RETURNING` is only supported by SQLite 3.35 and later
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+#: version of the queue database schema, stored as `PRAGMA user_version`. Must be increased whenever the schema that
+#: :class:`TaskQueue` creates changes.
+SCHEMA_VERSION = 1
+
+#: number of tasks a queue runner processes between two runs of `PRAGMA optimize`
+OPTIMIZE_INTERVAL = 1000
+
+#: colored operation labels and arrow for :meth:`Task.color_repr`, so they are not rebuilt for every listed task
+_COLOR_OPS = {x: f"{Fore.YELLOW}{x}{Fore.RESET}" for x in ("Echo", "Sleep", "COPY", "MOVE", "SCON", "CONV")}
+_COLOR_ARROW = f"{Fore.YELLOW}->{Fore.RESET}"
+
+#: minimum number of seconds between two checks of a queue runner whether the daemon that started it is still alive
+DAEMON_CHECK_INTERVAL = 5
+
+#: seconds after which a file in `CONVERT_CACHE_DIR` is considered stale by a queue runner that finishes
+CONVERT_CACHE_MAX_AGE = 3600
+
+
+# Tasks are (de)serialized with orjson if it is installed, which is considerably faster than the json module. Both
+# produce the same compact JSON, so that the UNIQUE(task, status) constraint of TaskQueue works independently of
+# which one is used.
+if orjson is not None:
+    def _dumps(x) -> str:
+        return orjson.dumps(x).decode("utf-8")
+
+    _loads = orjson.loads
+else:
+    def _dumps(x) -> str:
+        return json.dumps(x, separators=(",", ":"), ensure_ascii=False)
+
+    _loads = json.loads
+
 
 class TaskQueue:
     """CONVERT_CACHE_DIR = Path(appdirs.user_cache_dir("qop")).joinpath("convert_temp")
@@ -49,6 +90,7 @@ class TaskQueue:
         A TaskQueue is a sqlite3 database with the following columns
         - priority: integer value, the lower the value the earlier the task will be processed
         - task: json representation of the task to execute
+        - type: type of the task (see enums.TaskType). Redundant with `task`, but can be indexed.
         - status: status of the task (ok, active, fail,... see enums.Status)
         - lock: str lock id. NULL except for currently active tasks. usually an uuid
 
@@ -69,78 +111,229 @@ class TaskQueue:
 
         self.max_transfer_processes = max_transfer_processes
         self.max_convert_processes = max_convert_processes
-        self.con = sqlite3.connect(path, isolation_level="EXCLUSIVE", timeout=10)
         self.path = Path(path)
+        self.con = self._connect()
+        # released whenever new tasks become pending, so that idle queue runners do not have to poll the database
+        self._wakeup = self._new_wakeup()
 
         cur = self.con.cursor()
+        # the schema only has to be created or migrated if the queue was last opened by an older version of qop
+        if cur.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            cur.execute("""
+               CREATE TABLE IF NOT EXISTS tasks (
+                  priority INTEGER NOT NULL,
+                  task TEXT NOT NULL,
+                  type INTEGER,
+                  status INTEGER NOT NULL,
+                  lock TEXT,
+                  parent INTEGER,
+                  UNIQUE(task, status)              
+                )              
+            """)
+
+            # queues created by older versions of qop do not have a type column yet
+            if "type" not in [x[1] for x in cur.execute("PRAGMA table_info(tasks)").fetchall()]:
+                lg.info(f"adding column 'type' to queue {path}")
+                cur.execute("ALTER TABLE tasks ADD COLUMN type INTEGER")
+                records = cur.execute("SELECT _ROWID_, task FROM tasks").fetchall()
+                cur.executemany("UPDATE tasks SET type = ? WHERE _ROWID_ = ?", [(_loads(x[1])["type"], x[0]) for x in records])
+
+            # ix_tasks_pop serves pop() for a single task type. ix_tasks_status serves pop() for all or all-but-one task
+            # types and fetch() by status, both without sorting.
+            cur.execute("CREATE INDEX IF NOT EXISTS ix_tasks_pop ON tasks (status, type, priority)")
+            cur.execute("CREATE INDEX IF NOT EXISTS ix_tasks_status ON tasks (status, priority)")
+
+            # finished tasks moved out of the tasks table by archive(); oid is the _ROWID_ the task had in tasks
+            cur.execute("""
+               CREATE TABLE IF NOT EXISTS tasks_archive (
+                  oid INTEGER NOT NULL,
+                  priority INTEGER NOT NULL,
+                  task TEXT NOT NULL,
+                  type INTEGER,
+                  status INTEGER NOT NULL,
+                  parent INTEGER
+                )
+            """)
+
+            # task_counts keeps the number of tasks per status (separately for child and parent tasks) up to date via
+            # triggers, so that progress() and the n_* properties do not have to scan the whole tasks table.
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS task_counts (
+                  status INTEGER NOT NULL,
+                  child INTEGER NOT NULL,
+                  n INTEGER NOT NULL,
+                  PRIMARY KEY (status, child)
+                )
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_counts_insert AFTER INSERT ON tasks BEGIN
+                  UPDATE task_counts SET n = n + 1 WHERE status = NEW.status AND child = (NEW.parent IS NOT NULL);
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_counts_delete AFTER DELETE ON tasks BEGIN
+                  UPDATE task_counts SET n = n - 1 WHERE status = OLD.status AND child = (OLD.parent IS NOT NULL);
+                END
+            """)
+            cur.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_counts_update AFTER UPDATE OF status, parent ON tasks BEGIN
+                  UPDATE task_counts SET n = n - 1 WHERE status = OLD.status AND child = (OLD.parent IS NOT NULL);
+                  UPDATE task_counts SET n = n + 1 WHERE status = NEW.status AND child = (NEW.parent IS NOT NULL);
+                END
+            """)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        # the counts are rebuilt when the queue is opened in case they were modified by something other than qop
+        cur.execute("DELETE FROM task_counts")
+        cur.executemany(
+            "INSERT INTO task_counts (status, child, n) VALUES (?, ?, 0)",
+            [(int(status), child) for status in Status for child in (0, 1)]
+        )
         cur.execute("""
-           CREATE TABLE IF NOT EXISTS tasks (
-              priority INTEGER NOT NULL,
-              task TEXT NOT NULL,
-              status INTEGER NOT NULL,
-              lock TEXT,
-              parent INTEGER,
-              UNIQUE(task, status)              
-            )              
+            UPDATE task_counts SET n = (
+              SELECT COUNT(1) FROM tasks WHERE tasks.status = task_counts.status AND (tasks.parent IS NOT NULL) = task_counts.child
+            )
         """)
+
         self.con.commit()
+        cur.close()
 
-    def put(self, task: "Task", priority: int = 10, parent: Optional[int] = None) -> None:
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection to the queue database. The database uses write-ahead logging so that readers (for example
+        the daemon querying progress) do not block the queue runners and vice versa, and commits only append to the
+        WAL instead of syncing a rollback journal.
+        """
+        con = sqlite3.connect(self.path, timeout=10)
+        journal_mode = con.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            # for example on network file systems that do not support the shared memory WAL requires
+            lg.warning(f"cannot enable write-ahead logging for queue {self.path}; using journal_mode={journal_mode}")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA temp_store=MEMORY")
+        con.execute("PRAGMA cache_size=-16000")  # 16 MB
+        con.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        # rows replaced by INSERT OR REPLACE must fire the delete trigger that maintains task_counts
+        con.execute("PRAGMA recursive_triggers=ON")
+        # refresh the query planner statistics if they are missing or stale (limited to a quick analysis of tables
+        # that need it, as recommended by the SQLite documentation for long-lived connections)
+        con.execute("PRAGMA optimize=0x10002")
+        return con
+
+    def close(self) -> None:
+        """
+        Update the query planner statistics of the queue and close the database connection
+        """
+        self.con.execute("PRAGMA optimize")
+        self.con.close()
+
+    def __enter__(self) -> "TaskQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def put(self, task: "Task", priority: int = 10, parent: Optional[int] = None) -> int:
         """
         Enqueue a Task
 
         :param task: Task to be added to the queue
         :param priority: (optional) priority for executing `task` (tasks with lower priority will be executed earlier)
         :param parent: (optional) only for child tasks, oid/_ROWID_ of the task that spawned this task
+
+        :return: the oid/_ROWID_ of the enqueued task
         """
 
-        lg.debug(f"trying to inserted task {task.to_dict()}")
-        cur = self.con.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO tasks (priority, task, status, parent) VALUES (?, ?, ?, ?)",
-            (priority, task.to_json(), Status.PENDING, parent)
-        )
+        return self.put_many([task], priority=priority, parent=parent)[0]
+
+    def put_many(self, tasks: Iterable["Task"], priority: int = 10, parent: Optional[int] = None) -> List[int]:
+        """
+        Enqueue several Tasks at once. All tasks are inserted in a single transaction, which is much faster than
+        calling :meth:`put` for each task.
+
+        :param tasks: Tasks to be added to the queue
+        :param priority: (optional) priority for executing the `tasks`
+        :param parent: (optional) only for child tasks, oid/_ROWID_ of the task that spawned these tasks
 
+        :return: the oids/_ROWID_s of the enqueued tasks (in the same order as `tasks`)
+        """
+        oids = self._insert(tasks, priority=priority, parent=parent)
         hammer_commit(self.con)
-        lg.debug(f"inserted task {task.to_dict()}")
+        self._notify_pending()
+        lg.debug(f"inserted {len(oids)} tasks")
+        return oids
+
+    def _insert(self, tasks: Iterable["Task"], priority: int, parent: Optional[int]) -> List[int]:
+        """Insert tasks without committing the transaction. Returns the oids of the inserted tasks."""
+        rows = [(priority, task.to_json(), task.type, Status.PENDING, parent) for task in tasks]
+        lg.debug(f"trying to insert {len(rows)} tasks")
+        # executemany() discards the rowids, and INSERT OR REPLACE assigns a new one if it replaces a task
+        sql = "INSERT OR REPLACE INTO tasks (priority, task, type, status, parent) VALUES (?, ?, ?, ?, ?)"
+        return [self.con.execute(sql, row).lastrowid for row in rows]
 
     def pop(self, task_type_include: Optional[TaskType] = None, task_type_exclude: Optional[TaskType] = None) -> "Task":
         """
         Retrieves a :class:`~qop.tasks.Task` and sets its status in the queue to :class:`Status.ACTIVE <qop.constants.Status>`
 
-        :raises AlreadyUnderEvaluationError: If trying to pop a tasks that is already being processed  (i.e. if a race
-            condition occurs if the queue is processed in parallel)
+        :raises QueueEmptyError: If there are no pending tasks (of the requested type). A subclass of `IndexError`.
+        :raises AlreadyUnderEvaluationError: If another process claimed the selected task first (i.e. if a race
+            condition occurs if the queue is processed in parallel). Can only happen with SQLite versions older than
+            3.35, otherwise a task is selected and locked in one atomic statement.
         """
-        cur = self.con.cursor()
-
         assert task_type_include is None or task_type_exclude is None
 
         if task_type_include is not None:
-            cur.execute(
-                f"SELECT _ROWID_ FROM tasks WHERE status = ? AND task LIKE '__type___{int(task_type_include)}%' ORDER BY priority LIMIT 1",
-                (Status.PENDING,))
+            where = "status = ? AND type = ?"
+            params = (int(Status.PENDING), int(task_type_include))
         elif task_type_exclude is not None:
-            cur.execute(
-                f"SELECT _ROWID_ FROM tasks WHERE status = ? AND task NOT LIKE '__type___{int(task_type_exclude)}%' ORDER BY priority LIMIT 1",
-                (Status.PENDING,))
+            where = "status = ? AND type <> ?"
+            params = (int(Status.PENDING), int(task_type_exclude))
         else:
-            cur.execute("SELECT _ROWID_ FROM tasks WHERE status = ? ORDER BY priority LIMIT 1", (Status.PENDING,))
-
-        oid = cur.fetchall()[0][0].__str__()
+            where = "status = ?"
+            params = (int(Status.PENDING),)
 
         # insert a lock UUID into the table so that we can ensure not second thread tries to execute the same
         # task
         lock = uuid.uuid4().hex
-        self.set_status(oid, Status.ACTIVE, lock)
-        cur.execute("SELECT lock, task FROM tasks WHERE _ROWID_ = ?", (oid,))
-        record = cur.fetchall()[0]
-        cur.close()
 
-        if record[0] != lock:
-            raise AlreadyUnderEvaluationError
-
-        task = Task.from_dict(json.loads(record[1]))
-        lg.debug(f"popped task {task}")
+        if SQLITE_HAS_RETURNING:
+            record = self.con.execute(
+                f"UPDATE tasks SET status = ?, lock = ? "
+                f"WHERE _ROWID_ = (SELECT _ROWID_ FROM tasks WHERE {where} ORDER BY priority, _ROWID_ LIMIT 1) "
+                f"RETURNING _ROWID_, task",
+                (int(Status.ACTIVE), lock) + params
+            ).fetchone()
+            hammer_commit(self.con)
+
+            if record is None:
+                raise QueueEmptyError("no pending tasks")
+            oid = str(record[0])
+            lg.info(f"mark {oid} {Status.ACTIVE.name}")
+            task_json = record[1]
+        else:
+            record = self.con.execute(
+                f"SELECT _ROWID_, task FROM tasks WHERE {where} ORDER BY priority, _ROWID_ LIMIT 1",
+                params
+            ).fetchone()
+            if record is None:
+                raise QueueEmptyError("no pending tasks")
+            oid = str(record[0])
+
+            # the task is only claimed if it is still pending, i.e. if no other runner claimed it since the SELECT
+            n_claimed = self.con.execute(
+                "UPDATE tasks SET status = ?, lock = ? WHERE _ROWID_ = ? AND status = ?",
+                (int(Status.ACTIVE), lock, oid, int(Status.PENDING))
+            ).rowcount
+            hammer_commit(self.con)
+
+            if n_claimed != 1:
+                raise AlreadyUnderEvaluationError
+            lg.info(f"mark {oid} {Status.ACTIVE.name}")
+            task_json = record[1]
+
+        task = Task.from_dict(_loads(task_json), trusted=True)
+        if lg.isEnabledFor(logging.DEBUG):
+            lg.debug(f"popped task {task}")
         task.oid = oid
         return task
 
@@ -148,18 +341,23 @@ class TaskQueue:
         """
         Retrieves a :class:`~qop.tasks.Task` without changing its status in the queue
         """
-        cur = self.con.cursor()
-        cur.execute("SELECT lock, task from tasks ORDER BY priority LIMIT 1")
-        record = cur.fetchall()[0]
-        oid = record[0]
-
-        if oid is not None:
-            oid = str(oid)
+        record = self.con.execute("SELECT _ROWID_, task from tasks ORDER BY priority LIMIT 1").fetchone()
+        if record is None:
+            raise QueueEmptyError("queue is empty")
 
-        task = Task.from_dict(json.loads(record[1]))
-        task.oid = oid
+        task = Task.from_dict(_loads(record[1]), trusted=True)
+        task.oid = str(record[0])
         return task
 
+    def peek_meta(self) -> Dict:
+        """
+        Like :meth:`peek`, but only retrieves the metadata of the task (see :meth:`fetch_meta`)
+        """
+        res = self.fetch_meta(n=1)
+        if not res:
+            raise QueueEmptyError("queue is empty")
+        return res[0]
+
     def print(self, status: Union[Tuple, int, None] = None, n: int = 10) -> None:
         """
         Print an overview of the queue
@@ -168,66 +366,95 @@ class TaskQueue:
         :param status: If not None, only fetch Tasks of the given status(es)
         """
         assert isinstance(n, int) and (n > 0)
-        records = self.fetch(n=n, status=status)
-        for record in records:
-            print(f"[{record[0]}] {Task.from_dict(json.loads(record[1]))}")
+        for record in self.fetch_iter(n=n, status=status):
+            print(f"[{record['priority']}] {Task.from_dict(record['task'], trusted=True)}")
 
-    def fetch(self, status: Union[Tuple, int, Status, None] = None, n: Optional[int] = None) -> List:
+    def fetch(
+            self,
+            status: Union[Tuple, int, Status, None] = None,
+            n: Optional[int] = None,
+            task_type: Optional[TaskType] = None
+    ) -> List:
         """
         Retrieve the queue
 
         :param n: number of tasks to fetch
         :param status: If not None, only fetch Tasks of the given status(es)
+        :param task_type: If not None, only fetch Tasks of the given type. Filters on the indexed `type` column, so
+            the payload of other tasks is never read.
+
+        :return a list of dicts with the `priority` and `task` of up to n queued tasks
+        """
+        return list(self.fetch_iter(status=status, n=n, task_type=task_type))
+
+    def fetch_iter(
+            self,
+            status: Union[Tuple, int, Status, None] = None,
+            n: Optional[int] = None,
+            task_type: Optional[TaskType] = None
+    ) -> Iterator[Dict]:
+        """
+        Like :meth:`fetch`, but yields the tasks one by one instead of loading all matching rows into memory at once
+        """
+        cur = self._select("priority, task", status=status, n=n, task_type=task_type)
+        for priority, task in cur:
+            yield {"priority": priority, "task": _loads(task)}
 
-        :return a dict containing n queued tasks
+    def fetch_meta(
+            self,
+            status: Union[Tuple, int, Status, None] = None,
+            n: Optional[int] = None,
+            task_type: Optional[TaskType] = None
+    ) -> List[Dict]:
+        """
+        Like :meth:`fetch`, but only retrieves the `oid`, `type`, `priority` and `status` of tasks. This does not need
+        to deserialize the tasks and is therefore considerably faster for large queues.
         """
+        cur = self._select("_ROWID_, type, priority, status", status=status, n=n, task_type=task_type)
+        return [{"oid": str(x[0]), "type": x[1], "priority": x[2], "status": x[3]} for x in cur]
+
+    def _select(
+            self,
+            columns: str,
+            status: Union[Tuple, int, Status, None] = None,
+            n: Optional[int] = None,
+            task_type: Optional[TaskType] = None
+    ) -> sqlite3.Cursor:
+        where = []
+        params = ()
 
         if status is not None:
             if isinstance(status, int):
                 status = (status,)
-            elif isinstance(status, Status):
-                status = (int(status),)
             if len(status) > 0:
                 status = tuple(int(s) for s in status)
             else:
                 raise ValueError("illegal status")
+            where.append(f"status IN ({','.join(['?' for x in status])})")
+            params = params + status
 
-            cur = self.con.cursor()
-            if n:
-                cur.execute(
-                    f"SELECT status, task FROM tasks "
-                    f"WHERE status IN ({','.join(['?' for x in status])}) "
-                    f"ORDER BY priority LIMIT ?",
-                    status + (n,)
-                )
-            else:
-                cur.execute(
-                    f"SELECT status, task FROM tasks "
-                    f"WHERE status IN ({','.join(['?' for x in status])})"
-                    "ORDER BY priority",
-                    status
-                )
-        else:
-            cur = self.con.cursor()
-            if n:
-                cur.execute("SELECT status, task from tasks ORDER BY priority LIMIT ?", (str(n),))
-            else:
-                cur.execute("SELECT status, task from tasks ORDER BY priority")
+        if task_type is not None:
+            where.append("type = ?")
+            params = params + (int(task_type),)
 
-        res = cur.fetchall()
-        cur.close()
-        res = [{"priority":x[0], "task":json.loads(x[1])} for x in res]
-        return res
+        sql = f"SELECT {columns} FROM tasks"
+        if where:
+            sql = sql + " WHERE " + " AND ".join(where)
+        sql = sql + " ORDER BY priority"
+        if n:
+            sql = sql + " LIMIT ?"
+            params = params + (n,)
+
+        return self.con.execute(sql, params)
 
     def reset_active_tasks(self) -> None:
         """
         Reset all active tasks to :class:`Status.PENDING <qop.constants.Status>`
         """
         lg.info(f"set all active tasks to pending")
-        cur = self.con.cursor()
-        cur.execute("UPDATE tasks SET status = ?, lock = NULL where status = ?", (int(Status.PENDING), int(Status.ACTIVE)))
+        self.con.execute("UPDATE tasks SET status = ?, lock = NULL where status = ?", (int(Status.PENDING), int(Status.ACTIVE)))
         hammer_commit(self.con)
-        cur.close()
+        self._notify_pending()
 
     def set_status(self, oid: int, status: Status, lock: str = None) -> None:
         """
@@ -241,17 +468,72 @@ class TaskQueue:
             Must be `None` except for switching tasks to *active*.
         """
         lg.info(f"mark {oid} {status.name}")
-        cur = self.con.cursor()
 
         if status == Status.ACTIVE:
             assert lock is not None
-            cur.execute("UPDATE tasks SET status = ?, lock = ? where _ROWID_ = ?", (int(status), lock, oid))
+            self.con.execute("UPDATE tasks SET status = ?, lock = ? where _ROWID_ = ?", (int(status), lock, oid))
         else:
             assert lock is None
-            cur.execute("UPDATE tasks SET status = ?, lock = NULL where _ROWID_ = ?", (int(status), oid))
+            self.con.execute("UPDATE tasks SET status = ?, lock = NULL where _ROWID_ = ?", (int(status), oid))
 
         hammer_commit(self.con)
-        cur.close()
+        if status == Status.PENDING:
+            self._notify_pending()
+
+    def _complete(self, task: "Task", status: Status, follow_up: Optional["Task"] = None) -> None:
+        """
+        Set the status of a task that has been processed (and of its parent task, if it has one) and enqueue its
+        follow-up task. All changes are committed in a single transaction.
+
+        :param task: a Task that was retrieved with :meth:`pop`
+        :param status: the new :class:`~qop.constants.Status` of the task, usually *ok* or *fail*
+        :param follow_up: (optional) a child task spawned by `task`. It is enqueued with maximum priority.
+        """
+        try:
+            lg.info(f"mark {task.oid} {status.name}")
+            self.con.execute("UPDATE tasks SET status = ?, lock = NULL where _ROWID_ = ?", (int(status), task.oid))
+            if follow_up is not None:
+                self._insert([follow_up], priority=-1, parent=task.oid)
+            if task.parent_oid is not None:
+                lg.info(f"mark {task.parent_oid} {status.name}")
+                self.con.execute("UPDATE tasks SET status = ?, lock = NULL where _ROWID_ = ?", (int(status), task.parent_oid))
+            hammer_commit(self.con)
+        except:
+            self.con.rollback()
+            raise
+
+        # also wakes idle runners if this was the last active task, so that they can exit without waiting for the
+        # timeout. This never blocks, even if another runner was terminated while it was waking up runners itself.
+        self._notify_pending()
+
+    def _new_wakeup(self) -> multiprocessing.BoundedSemaphore:
+        """
+        Create the semaphore that idle queue runners wait on. It starts at zero and can be released at most once per
+        runner. Unlike a Condition, acquiring and releasing it leaves no state behind that a runner terminated by
+        :meth:`stop` could leave inconsistent, and releasing it never blocks.
+        """
+        n = max(1, self.max_transfer_processes + self.max_convert_processes)
+        res = multiprocessing.BoundedSemaphore(n)
+        for _ in range(n):
+            res.acquire(block=False)
+        self._n_wakeups = n
+        return res
+
+    def _notify_pending(self) -> None:
+        """Wake up queue runners that are waiting for pending tasks (or for the queue to be finished)"""
+        # BoundedSemaphore does not enforce its bound on every platform (e.g. macOS), so never release it more often
+        # than there are runners. Where its value can be read, only release the wake-ups that are missing.
+        try:
+            n = self._n_wakeups - self._wakeup.get_value()
+        except NotImplementedError:
+            n = self._n_wakeups
+
+        for _ in range(n):
+            try:
+                self._wakeup.release()
+            except ValueError:
+                # every runner has a pending wake-up
+                break
 
     def start(self, ip=None, port=None) -> None:
         """Execute all pending tasks"""
@@ -305,63 +587,150 @@ class TaskQueue:
         :param task_type_include: see .pop()
         :param task_type_exclude: see .pop()
         """
-        progress = self.progress(include_children=True)
-        while progress.pending > 0 or progress.active > 0:
-            progress = self.progress(include_children=True)
-
-            if ip is not None:
+        # sqlite3 connections must not be shared across processes, so every runner opens its own
+        self.con = self._connect()
+
+        n_popped = 0
+        last_daemon_check = monotonic()
+        while True:
+            # connecting to the daemon is comparatively expensive for both sides, so don't do it for every task
+            if ip is not None and monotonic() - last_daemon_check >= DAEMON_CHECK_INTERVAL:
+                last_daemon_check = monotonic()
                 if _utils.is_daemon_active(ip=ip, port=port) is False:
                     lg.fatal("cannot find daemon thread. stopping queue.")
                     break
             try:
                 op = self.pop(task_type_include=task_type_include, task_type_exclude=task_type_exclude)
-            except:
+            except QueueEmptyError:
+                # active tasks of other runners may still spawn follow-up tasks (e.g. a MoveTask after a ConvertTask)
+                progress = self.progress(include_children=True)
+                if progress.pending == 0 and progress.active == 0:
+                    break
                 lg.debug("waiting for more tasks of correct status")
+                # the timeout is a fallback for tasks that were added to the queue by another TaskQueue instance
+                self._wakeup.acquire(timeout=1)
+                continue
+            except AlreadyUnderEvaluationError:
+                # another runner claimed the task first; there may be more
+                continue
+            except sqlite3.OperationalError as e:
+                lg.warning(f"cannot retrieve task from queue: {e}")
+                self.con.rollback()
                 sleep(1)
                 continue
+
+            n_popped += 1
+            if n_popped % OPTIMIZE_INTERVAL == 0:
+                self.con.execute("PRAGMA optimize")
+
             try:
                 op.start()
                 lg.info(f"task finished: {op}")
-                self.set_status(op.oid, Status.OK)
                 try:
                     follow_up = op.spawn()
-                    self.put(follow_up, priority=-1, parent=op.oid)
-                    lg.info(f"spawned childtask: {follow_up}")
                 except AttributeError:
-                    pass
+                    follow_up = None
 
+                self._complete(op, Status.OK, follow_up)
+                if follow_up is not None:
+                    lg.info(f"spawned childtask: {follow_up}")
                 if op.parent_oid is not None:
-                    self.set_status(op.parent_oid, Status.OK)
                     lg.info(f"parent task finished: {op.parent_oid}")
 
-            except:
+            except Exception:
                 lg.error(f"task failed: {op}", exc_info=True)
-                self.set_status(op.oid, Status.FAIL)
+                if not self.__fail(op):
+                    continue
                 if op.parent_oid is not None:
-                    self.set_status(op.parent_oid, Status.FAIL)
                     lg.info(f"parent task completed: {op.parent_oid}")
 
-        _utils.purge_convert_cache()
+        self.close()
+        # other runners (or a runner started after this one finished) may still be using the convert cache
+        _utils.purge_convert_cache(min_age=CONVERT_CACHE_MAX_AGE)
         lg.info("queue is finished")
 
+    def __fail(self, task: "Task", attempts: int = 10) -> bool:
+        """
+        Mark a task that raised an exception as *failed*. Called internally by the queue runners, which must survive
+        this even if the database is locked for longer than :func:`~qop._utils.hammer_commit` keeps retrying;
+        otherwise the task would stay *active* forever.
+
+        :param task: a Task that was retrieved with :meth:`pop`
+        :param attempts: how often to retry (in a fresh transaction) before giving up
+
+        :return: `True` if the task could be marked as failed. If not, it remains *active* until
+            :meth:`reset_active_tasks` is called (e.g. by :meth:`stop`).
+        """
+        for i in range(attempts):
+            try:
+                self._complete(task, Status.FAIL)
+                return True
+            except Exception:
+                lg.error(f"cannot mark task {task.oid} as failed (attempt {i + 1}/{attempts})", exc_info=True)
+                sleep(1)
+
+        return False
+
     def stop(self) -> None:
         for p in self.convert_processes + self.transfer_processes:
             p.terminate()
+        for p in self.convert_processes + self.transfer_processes:
+            p.join()
+        self.convert_processes = []
+        self.transfer_processes = []
+        # runners started later may be sized differently (the daemon stops and restarts the queue to resize it)
+        self._wakeup = self._new_wakeup()
 
         _utils.purge_convert_cache()
         self.reset_active_tasks()
 
     def flush(self, status: Union[Status, int, None] = None) -> None:
         """empty the queue"""
-        cur = self.con.cursor()
         if status is None:
-            cur.execute("DELETE FROM tasks")
+            self.con.execute("DELETE FROM tasks")
             lg.info("flushing queue")
         else:
-            cur.execute("DELETE FROM tasks where status == ?", (int(status),))
+            self.con.execute("DELETE FROM tasks where status == ?", (int(status),))
             lg.info(f"flushing tasks with status '{status.name}' from queue")
         hammer_commit(self.con)
-        cur.close()
+
+    def archive(self, keep_last: int = 0) -> int:
+        """
+        Move finished tasks (:class:`Status.OK, FAIL and SKIP <qop.constants.Status>`) from the queue to the
+        `tasks_archive` table, so that the queue only has to deal with tasks that still need processing. Tasks with
+        unfinished child tasks are kept, as the status of a parent task is updated when its child tasks finish.
+        Archived tasks no longer count towards :meth:`progress`.
+
+        :param keep_last: number of most recently enqueued finished tasks to keep in the queue
+
+        :return: the number of archived tasks
+        """
+        if keep_last < 0:
+            raise ValueError(f"keep_last must not be negative, not {keep_last}")
+
+        finished = f"{int(Status.OK)}, {int(Status.FAIL)}, {int(Status.SKIP)}"
+        where = f"""
+            status IN ({finished}) AND NOT EXISTS (
+              SELECT 1 FROM tasks AS child
+              WHERE child.parent = tasks._ROWID_ AND child.status IN ({int(Status.PENDING)}, {int(Status.ACTIVE)})
+            ) AND _ROWID_ NOT IN (
+              SELECT _ROWID_ FROM tasks WHERE status IN ({finished}) ORDER BY _ROWID_ DESC LIMIT ?
+            )
+        """
+        try:
+            self.con.execute(
+                "INSERT INTO tasks_archive (oid, priority, task, type, status, parent) "
+                f"SELECT _ROWID_, priority, task, type, status, parent FROM tasks WHERE {where}",
+                (keep_last,)
+            )
+            n = self.con.execute(f"DELETE FROM tasks WHERE {where}", (keep_last,)).rowcount
+            hammer_commit(self.con)
+        except:
+            self.con.rollback()
+            raise
+
+        lg.info(f"archived {n} finished tasks")
+        return n
 
     def facts(self) -> Dict:
         ap_convert = self.active_processes("convert")
@@ -407,51 +776,39 @@ class TaskQueue:
     @property
     def n_total(self) -> int:
         """Count of all tasks in queue (including failed and completed)"""
-        cur = self.con.cursor()
-        res = cur.execute("SELECT COUNT(1) from tasks").fetchall()[0][0]
-        cur.close()
-        return res
+        return self.progress(include_children=True).total
 
     @property
     def n_pending(self) -> int:
         """Number of pending tasks"""
-        cur = self.con.cursor()
-        res = cur.execute("SELECT COUNT(1) FROM tasks WHERE status = ?", (int(Status.PENDING),)).fetchall()[0][0]
-        cur.close()
-        return res
+        return self.progress(include_children=True).pending
 
     @property
     def n_active(self) -> int:
         """Count of currently active tasks"""
-        cur = self.con.cursor()
-        res = cur.execute("SELECT COUNT(1) FROM tasks WHERE status = ?", (int(Status.ACTIVE),)).fetchall()[0][0]
-        cur.close()
-        return res
+        return self.progress(include_children=True).active
 
     @property
     def n_ok(self) -> int:
         """count of completed tasks"""
-        cur = self.con.cursor()
-        res = cur.execute("SELECT COUNT(1) from tasks WHERE status = ?", (int(Status.OK),)).fetchall()[0][0]
-        cur.close()
-        return res
+        return self.progress(include_children=True).ok
 
     @property
     def n_fail(self) -> int:
         """count of completed tasks"""
-        cur = self.con.cursor()
-        res = cur.execute("SELECT COUNT(1) from tasks WHERE status = ?", (int(Status.FAIL),)).fetchall()[0][0]
-        cur.close()
-        return res
+        return self.progress(include_children=True).fail
 
     def progress(self, include_children: bool = False) -> "QueueProgress":
-        cur = self.con.cursor()
+        """
+        Number of tasks per status, read from the task_counts table in a single query. The `n_*` properties are
+        shortcuts for this.
+
+        :param include_children: whether to count child tasks (such as the moves spawned by convert tasks)
+        """
         if include_children:
-            cur.execute("SELECT status, COUNT(1) from tasks GROUP BY status")
+            res = self.con.execute("SELECT status, SUM(n) from task_counts GROUP BY status").fetchall()
         else:
-            cur.execute("SELECT status, COUNT(1) FROM tasks WHERE parent is NULL GROUP BY status")
-        res = cur.fetchall()
-        cur.close()
+            res = self.con.execute("SELECT status, n FROM task_counts WHERE child = 0").fetchall()
 
         return QueueProgress.from_list(res)
 
@@ -471,33 +828,25 @@ class Task:
         raise NotImplementedError
 
     @staticmethod
-    def from_dict(x: Dict) -> "Task":
-        """Create a Task of the appropriate subclass from a python dict"""
-        lg.debug(f"parsing task {x}")
-        task_type = x["type"]
-
-        if task_type == 0:
-            return Task()
-        elif task_type == TaskType.ECHO:
-            return EchoTask(x["msg"])
-        elif task_type == TaskType.FILE:
-            return FileTask(x["src"])
-        elif task_type == TaskType.DELETE:
-            return DeleteTask(x["src"])
-        elif task_type == TaskType.COPY:
-            return CopyTask(x["src"], x["dst"])
-        elif task_type == TaskType.MOVE:
-            return MoveTask(x["src"], x["dst"], x['parent_oid'])
-        elif task_type == TaskType.CONVERT_SIMPLE:
-            return SimpleConvertTask(x['src'], x['dst'], converter=converters.Converter.from_dict(x["converter"]))
-        elif task_type == TaskType.CONVERT:
-            return ConvertTask(x['src'], x['dst'], converter=converters.Converter.from_dict(x["converter"]))
-        elif task_type == TaskType.FAIL:
-            return FailTask()
-        elif task_type == TaskType.SLEEP:
-            return SleepTask(x['seconds'])
-        else:
+    def from_dict(x: Dict, trusted: bool = False) -> "Task":
+        """
+        Create a Task of the appropriate subclass from a python dict
+
+        :param x: a dict as returned by :meth:`to_dict`
+        :param trusted: `True` if `x` was serialized by the queue itself. Only then are file tasks restored as they
+            were stored, without resolving their paths again. Tasks from any other source (such as clients of the
+            daemon) are created via their constructors.
+        """
+        if lg.isEnabledFor(logging.DEBUG):
+            lg.debug(f"parsing task {x}")
+        if trusted:
+            cls = _FILE_TASK_CLASSES.get(x["type"])
+            if cls is not None:
+                return _restore_file_task(cls, x)
+        constructor = _TASK_CONSTRUCTORS.get(x["type"])
+        if constructor is None:
             raise UnknownTaskTypeError
+        return constructor(x)
 
     def __repr__(self) -> str:
         return 'NULL'
@@ -509,12 +858,7 @@ class Task:
         return self.__dict__ != other.__dict__
 
     def to_dict(self) -> Dict:
-        r = self.__dict__.copy()
-
-        for el in ("src", "dst"):
-            if el in r.keys():
-                r[el] = str(r[el])
-        return r
+        return self.__dict__.copy()
 
     def color_repr(self, color=True):
         self.__repr__()
@@ -522,8 +866,8 @@ class Task:
     def __validate__(self) -> None:
         pass
 
-    def to_json(self):
-        return json.dumps(self.to_dict())
+    def to_json(self) -> str:
+        return _dumps(self.to_dict())
 
 
 class EchoTask(Task):
@@ -541,9 +885,7 @@ class EchoTask(Task):
 
     def color_repr(self, color=True):
         if color:
-            op = Fore.YELLOW + "Echo" + Fore.RESET
-            msg = Fore.BLUE + self.msg + Fore.RESET
-            return f'{op} {msg}'
+            return f'{_COLOR_OPS["Echo"]} {Fore.BLUE}{self.msg}{Fore.RESET}'
         else:
             return self.__repr__()
 
@@ -565,9 +907,7 @@ class SleepTask(Task):
 
     def color_repr(self, color=True):
         if color:
-            op = Fore.YELLOW + "Sleep" + Fore.RESET
-            msg = Fore.BLUE + self.seconds + Fore.RESET
-            return f'{op} {msg}'
+            return f'{_COLOR_OPS["Sleep"]} {Fore.BLUE}{self.seconds}{Fore.RESET}'
         else:
             return self.__repr__()
 
@@ -590,16 +930,24 @@ class FileTask(Task):
     """Abstract class for all file-based tasks"""
     def __init__(self, src: Pathish) -> None:
         super().__init__()
-        self.src = Path(src).resolve()
+        self.src = _utils.resolve_file(src)
         self.type = None
 
     def start(self) -> None:
         pass
 
+    def to_dict(self) -> Dict:
+        r = super().to_dict()
+        r["src"] = str(self.src)
+        return r
+
     def __validate__(self) -> None:
-        if not self.src.exists():
-            raise FileNotFoundError(f'{self.src} does not exist')
-        elif not (self.src.is_dir() or self.src.is_file()):
+        # a single stat() instead of the three that exists(), is_dir() and is_file() would need
+        try:
+            mode = os.stat(self.src).st_mode
+        except (FileNotFoundError, NotADirectoryError):
+            raise FileNotFoundError(f'{self.src} does not exist') from None
+        if not (stat.S_ISDIR(mode) or stat.S_ISREG(mode)):
             raise TypeError(f'{self.src} is neither a file nor directory')
 
 
@@ -620,39 +968,39 @@ class CopyTask(FileTask):
     """Copy a file"""
     def __init__(self, src: Pathish, dst: Pathish) -> None:
         super().__init__(src=src)
-        self.dst = Path(dst).resolve()
+        self.dst = _utils.resolve_file(dst)
         self.type = TaskType.COPY
 
     def color_repr(self, color=True) -> str:
         if color:
-            op = Fore.YELLOW + "COPY" + Fore.RESET
-            arrow = Fore.YELLOW + "->" + Fore.RESET
-            src = self.src
-            dst = self.dst
-            return f'{op} {src} {arrow} {dst}'
+            return f'{_COLOR_OPS["COPY"]} {self.src} {_COLOR_ARROW} {self.dst}'
         else:
             return self.__repr__()
 
     def __repr__(self) -> str:
         return f'COPY {self.src} -> {self.dst}'
 
+    def to_dict(self) -> Dict:
+        r = super().to_dict()
+        r["dst"] = str(self.dst)
+        return r
+
     def __validate__(self) -> None:
         super().__validate__()
         if self.dst.exists():
-            if filecmp.cmp(self.dst, self.src):
+            if _utils.files_identical(self.dst, self.src):
                 raise FileExistsAndIsIdenticalError
             else:
                 raise FileExistsError
 
     def start(self) -> None:
         self.__validate__()
-        if not self.dst.parent.exists():
-            self.dst.parent.mkdir(parents=True)
+        self.dst.parent.mkdir(parents=True, exist_ok=True)
 
         if self.src.is_dir():
-            shutil.copytree(self.src, self.dst)
+            shutil.copytree(self.src, self.dst, copy_function=_utils.copy_file_with_stat)
         else:
-            shutil.copy(self.src, self.dst)
+            _utils.copy_file(self.src, self.dst)
 
         assert self.dst.exists()
         assert self.src.exists()
@@ -667,20 +1015,15 @@ class MoveTask(CopyTask):
 
     def start(self) -> None:
         super().__validate__()
-        if not self.dst.parent.exists():
-            self.dst.parent.mkdir(parents=True)
+        self.dst.parent.mkdir(parents=True, exist_ok=True)
 
-        shutil.move(self.src, self.dst)
+        shutil.move(self.src, self.dst, copy_function=_utils.copy_file_with_stat)
         assert self.dst.exists()
         assert not self.src.exists()
 
     def color_repr(self, color=True) -> str:
         if color:
-            op = Fore.YELLOW + "MOVE" + Fore.RESET
-            arrow = Fore.YELLOW + "->" + Fore.RESET
-            src = self.src
-            dst = self.dst
-            return f'{op} {src} {arrow} {dst}'
+            return f'{_COLOR_OPS["MOVE"]} {self.src} {_COLOR_ARROW} {self.dst}'
         else:
             return self.__repr__()
 
@@ -694,8 +1037,6 @@ class SimpleConvertTask(CopyTask):
         super().__init__(src=src, dst=dst)
         self.type = TaskType.CONVERT_SIMPLE
         self.converter = converter
-        self.src = Path(src).resolve()
-        self.dst = Path(dst).resolve()
 
     def start(self) -> None:
         super().__validate__()
@@ -705,11 +1046,7 @@ class SimpleConvertTask(CopyTask):
 
     def color_repr(self, color=True) -> str:
         if color:
-            op = Fore.YELLOW + "SCON" + Fore.RESET
-            arrow = Fore.YELLOW + "->" + Fore.RESET
-            src = self.src
-            dst = self.dst
-            return f'{op} {src} {arrow} {dst}'
+            return f'{_COLOR_OPS["SCON"]} {self.src} {_COLOR_ARROW} {self.dst}'
         else:
             return self.__repr__()
 
@@ -723,10 +1060,7 @@ class SimpleConvertTask(CopyTask):
             raise FileExistsAndCannotBeComparedError
 
     def to_dict(self) -> Dict:
-        r = self.__dict__.copy()
-        for el in ("src", "dst"):
-            if el in r.keys():
-                r[el] = str(r[el])
+        r = super().to_dict()
         r["converter"] = self.converter.to_dict()
         return r
 
@@ -761,11 +1095,7 @@ class ConvertTask(SimpleConvertTask):
 
     def color_repr(self, color=True) -> str:
         if color:
-            op = Fore.YELLOW + "CONV" + Fore.RESET
-            arrow = Fore.YELLOW + "->" + Fore.RESET
-            src = self.src
-            dst = self.dst
-            return f'{op} {src} {arrow} {dst}'
+            return f'{_COLOR_OPS["CONV"]} {self.src} {_COLOR_ARROW} {self.dst}'
         else:
             return self.__repr__()
 
@@ -773,11 +1103,8 @@ class ConvertTask(SimpleConvertTask):
         return f'CONV {self.src} -> {self.dst}'
 
     def to_dict(self) -> Dict:
-        r = self.__dict__.copy()
-        for el in ("src", "dst", "tmpdst"):
-            if el in r.keys():
-                r[el] = str(r[el])
-        r["converter"] = self.converter.to_dict()
+        r = super().to_dict()
+        r["tmpdst"] = str(self.tmpdst)
         return r
 
 
@@ -805,8 +1132,19 @@ class TaskQueueElement:
         return self.__dict__ != other.__dict__
 
 
+#: Maps the :class:`~qop.constants.Status` of a task to the corresponding field of :class:`QueueProgress`
+_STATUS_KEYS = {
+    Status.PENDING: "pending",
+    Status.OK: "ok",
+    Status.SKIP: "skip",
+    Status.ACTIVE: "active",
+    Status.FAIL: "fail"
+}
+
+
 class QueueProgress:
     """Info on the current status of the Queue"""
+    __slots__ = ("pending", "ok", "skip", "fail", "active")
 
     def __init__(self,  pending: int, ok: int, skip: int, fail: int, active: int):
         self.ok = ok
@@ -840,17 +1178,10 @@ class QueueProgress:
             "fail": 0
         }
 
-        for el in x:
-            if el[0] == Status.PENDING:
-                res.update({"pending": el[1]})
-            elif el[0] == Status.OK:
-                res.update({"ok": el[1]})
-            elif el[0] == Status.SKIP:
-                res.update({"skip": el[1]})
-            elif el[0] == Status.ACTIVE:
-                res.update({"active": el[1]})
-            elif el[0] == Status.FAIL:
-                res.update({"fail": el[1]})
+        for status, n in x:
+            key = _STATUS_KEYS.get(status)
+            if key is not None:
+                res[key] = n
 
         return QueueProgress.from_dict(res)
 
@@ -869,15 +1200,74 @@ class QueueProgress:
 
 
 def hammer_commit(con, max_tries=10):
-    if max_tries <= 1:
-        con.commit()
-    else:
+    """
+    Commit, and retry up to `max_tries` times if the database is locked. SQLite itself already waits for the busy
+    timeout of the connection before giving up, so retries should rarely be necessary.
+    """
+    for i in range(max_tries):
         try:
-            con.commit()
-        except:
-            sleep(0.1)
-            hammer_commit(con, max_tries=max_tries - 1)
+            return con.commit()
+        except sqlite3.OperationalError:
+            if i >= max_tries - 1:
+                raise
+            lg.debug(f"commit failed, retrying ({i + 1}/{max_tries})")
+            sleep(0.1 * (i + 1))
 
 
 class UnknownTaskTypeError(ValueError):
     pass
+
+
+def _restore_file_task(cls, x: Dict) -> FileTask:
+    """
+    Recreate a FileTask that was stored in the queue without calling its constructor. The paths of a serialized
+    FileTask have already been resolved when the task was created, so they do not need to be resolved again every time
+    a task is retrieved from the queue. Only the fields in :data:`_FILE_TASK_FIELDS` are restored.
+    """
+    task = cls.__new__(cls)
+
+    # iterate over x to restore the attributes in their original order, which determines the serialized form
+    for k, v in x.items():
+        if k not in _FILE_TASK_FIELDS:
+            continue
+        if k in ("src", "dst", "tmpdst"):
+            v = Path(v)
+        elif k == "converter":
+            v = converters.Converter.from_dict(v)
+        setattr(task, k, v)
+
+    return task
+
+
+#: Attributes that the `to_dict()` methods of the :class:`FileTask` subclasses emit
+_FILE_TASK_FIELDS = frozenset({"type", "src", "dst", "tmpdst", "converter", "parent_oid"})
+
+
+#: Used by :meth:`Task.from_dict` to create a Task of the appropriate subclass for a `type`. Keyed by plain ints,
+#: like the `type` of deserialized tasks, so that lookups do not need to compare enum members.
+_TASK_CONSTRUCTORS = {
+    0: lambda x: Task(),
+    int(TaskType.ECHO): lambda x: EchoTask(x["msg"]),
+    int(TaskType.FILE): lambda x: FileTask(x["src"]),
+    int(TaskType.DELETE): lambda x: DeleteTask(x["src"]),
+    int(TaskType.COPY): lambda x: CopyTask(x["src"], x["dst"]),
+    int(TaskType.MOVE): lambda x: MoveTask(x["src"], x["dst"], x.get("parent_oid")),
+    int(TaskType.CONVERT_SIMPLE): lambda x: SimpleConvertTask(
+        x["src"], x["dst"], converter=converters.Converter.from_dict(x["converter"])
+    ),
+    int(TaskType.CONVERT): lambda x: ConvertTask(
+        x["src"], x["dst"], converter=converters.Converter.from_dict(x["converter"])
+    ),
+    int(TaskType.FAIL): lambda x: FailTask(),
+    int(TaskType.SLEEP): lambda x: SleepTask(x["seconds"]),
+}
+
+#: Used by :meth:`Task.from_dict` to restore the file tasks that were stored in the queue
+_FILE_TASK_CLASSES = {
+    int(TaskType.FILE): FileTask,
+    int(TaskType.DELETE): DeleteTask,
+    int(TaskType.COPY): CopyTask,
+    int(TaskType.MOVE): MoveTask,
+    int(TaskType.CONVERT_SIMPLE): SimpleConvertTask,
+    int(TaskType.CONVERT): ConvertTask,
+}
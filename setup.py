@@ -10,5 +10,6 @@ setup(
     license='MIT',
     packages=['qop'],
     install_requires=['pydub', 'colorama', 'appdirs', 'mutagen', 'tqdm', 'mediafile'],
+    extras_require={'fast': ['orjson']},
     zip_safe=False
 )
\ No newline at end of file
@@ -1,6 +1,6 @@
 import pytest
 from qop import tasks, daemon, _utils
-from qop.constants import Command
+from qop.constants import Command, Status
 from time import sleep
 import subprocess
 
@@ -78,6 +78,24 @@ def test_daemon_sends_status_updates():
     assert p.total == 0
 
 
+def test_daemon_can_enqueue_many_tasks_at_once(tmp_path):
+    """QUEUE_PUT_MANY validates each task separately and only enqueues the valid ones"""
+    src = tmp_path.joinpath("foo")
+    src.write_text("foo")
+    client = daemon.QopClient()
+    client.send_command(Command.QUEUE_FLUSH_ALL)
+
+    payload = [tasks.EchoTask(f"{i} " + "x" * 100).to_dict() for i in range(50)]  # larger than a single recv()
+    payload.append(tasks.CopyTask(src, src).to_dict())  # destination exists and is identical
+    payload.append(tasks.CopyTask(tmp_path.joinpath("bar"), tmp_path.joinpath("baz")).to_dict())  # src does not exist
+    res = client.send_command(Command.QUEUE_PUT_MANY, payload=payload)
+
+    assert [x['status'] for x in res['payload']] == [Status.OK] * 50 + [Status.SKIP, Status.FAIL]
+    assert client.stats == {"ok": 50, "skip": 1, "fail": 1}
+    assert client.get_queue_progress().pending == 50
+    client.send_command(Command.QUEUE_FLUSH_ALL)
+
+
 def test_daemon_can_be_killed():
     """verify daemon can be shut down"""
     client = daemon.QopClient()
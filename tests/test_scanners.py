@@ -1,3 +1,4 @@
+import logging
 import pytest
 from pathlib import Path
 
@@ -47,6 +48,7 @@ def test_scan_a_directory_recursively_include_list(testfile_tree):
     i = 0
     for f in s.scan(root):
         i += 1
+        f = Path(f)
         assert f.is_dir() or f.suffix == ".flac"
 
     assert i == 3
@@ -61,6 +63,50 @@ def test_scan_a_directory_recursively_exclude_list(testfile_tree):
     i = 0
     for f in s.scan(root):
         i += 1
+        f = Path(f)
         assert f.is_dir() or f.suffix != ".flac"
 
     assert i == 5
+
+
+def test_scan_matches_extensions_case_insensitively(tmp_path):
+    """IncludeScanner and ExcludeScanner ignore the case of file extensions"""
+    _utils_tests.make_dummy_file(tmp_path.joinpath("foo.FLAC"))
+    _utils_tests.make_dummy_file(tmp_path.joinpath("bar.flac"))
+    _utils_tests.make_dummy_file(tmp_path.joinpath("baz.txt"))
+
+    res = sorted(Path(f).name for f in scanners.IncludeScanner(exts=["flac"]).scan(tmp_path))
+    assert res == ["bar.flac", "foo.FLAC"]
+
+    res = sorted(Path(f).name for f in scanners.ExcludeScanner(exts=["FLAC"]).scan(tmp_path))
+    assert res == ["baz.txt"]
+
+
+def test_scan_skips_junk_directories(tmp_path, caplog):
+    """Scanners do not descend into directories listed in skip_dirs, and log the directories they skip"""
+    _utils_tests.make_dummy_file(tmp_path.joinpath("foo.txt"))
+    _utils_tests.make_dummy_file(tmp_path.joinpath(".git/config.txt"))
+    _utils_tests.make_dummy_file(tmp_path.joinpath("bar/@eaDir/cover.txt"))
+
+    with caplog.at_level(logging.INFO, logger="qop.scanners"):
+        res = sorted(Path(f).relative_to(tmp_path).as_posix() for f in scanners.Scanner().scan(tmp_path))
+    assert res == ["bar", "foo.txt"]
+    assert str(tmp_path.joinpath(".git")) in caplog.text
+    assert str(tmp_path.joinpath("bar", "@eaDir")) in caplog.text
+
+    res = sorted(Path(f).relative_to(tmp_path).as_posix() for f in scanners.IncludeScanner(["txt"], skip_dirs=()).scan(tmp_path))
+    assert res == [".git/config.txt", "bar/@eaDir/cover.txt", "foo.txt"]
+
+
+def test_scan_all_skips_duplicate_roots(tmp_path):
+    """Scanner.scan_all() scans each distinct root once and reports the root along with each path"""
+    f = _utils_tests.make_dummy_file(tmp_path.joinpath("foo/bar.txt"))
+    root = tmp_path.joinpath("foo")
+
+    res = list(scanners.Scanner().scan_all([root, str(root), tmp_path.joinpath("foo/../foo")]))
+    assert res == [(root, str(f))]
+
+
+def test_Scanner_cannot_include_and_exclude_at_the_same_time():
+    with pytest.raises(ValueError):
+        scanners.Scanner(include=["flac"], exclude=["mp3"])
@@ -1,11 +1,14 @@
 from qop import tasks, converters, _utils
 from qop.exceptions import FileExistsAndIsIdenticalError
-from qop.constants import Status
+from qop.constants import Status, TaskType
 from pathlib import Path
 import pytest
 from time import sleep
 from pydub import generators
 import datetime
+import sqlite3
+import signal
+import multiprocessing
 import mediafile
 from mediafile import MediaFile
 
@@ -53,6 +56,20 @@ def test_FileTask_fails_on_missing_src(tmp_path):
     with pytest.raises(FileNotFoundError):
         op.__validate__()
 
+    # GIVEN a parent of src is a file
+    # WHEN validating Task
+    # THEN raise FileNotFoundError
+    src.touch()
+    with pytest.raises(FileNotFoundError):
+        tasks.FileTask(src.joinpath("bar")).__validate__()
+
+    # GIVEN src cannot be checked for another reason
+    # WHEN validating Task
+    # THEN pass on the original error
+    with pytest.raises(OSError) as e:
+        tasks.FileTask(tmp_path.joinpath("x" * 300)).__validate__()
+    assert not isinstance(e.value, FileNotFoundError)
+
 
 def test_DeleteTask(tmp_path):
     """DeleteTask deletes a file"""
@@ -91,6 +108,28 @@ def test_CopyTask_can_be_serialized(tmp_path):
     assert tsk == tasks.Task.from_dict(tsk.__dict__)
 
 
+def test_Task_from_dict_only_trusts_tasks_from_the_queue(tmp_path):
+    """Tasks from other sources have their paths resolved; restored tasks only get the fields of their class"""
+    tmp_path = tmp_path.resolve()
+    tmp_path.joinpath("real").mkdir()
+    tmp_path.joinpath("link").symlink_to(tmp_path.joinpath("real"))
+    x = {
+        "type": TaskType.COPY,
+        "src": str(tmp_path.joinpath("foo", "..", "src")),
+        "dst": str(tmp_path.joinpath("link", "dst")),
+        "start": "not a method",
+    }
+
+    tsk = tasks.Task.from_dict(x)
+    assert tsk.src == tmp_path.joinpath("src")
+    assert tsk.dst == tmp_path.joinpath("real", "dst")
+    assert "start" not in tsk.__dict__
+
+    tsk = tasks.Task.from_dict(x, trusted=True)
+    assert tsk.src == Path(x["src"])
+    assert "start" not in tsk.__dict__
+
+
 def test_CopyTask_fails_on_existing_dst(tmp_path):
     """CopyTask fails if dst file exists"""
     src = tmp_path.joinpath("foo")
@@ -335,6 +374,69 @@ def test_TaskQueue_sorts_by_priority(tmp_path):
         oq.pop()
 
 
+def test_TaskQueue_put_many(tmp_path):
+    """TaskQueue.put_many() enqueues several tasks at once"""
+    oq = tasks.TaskQueue(path=tmp_path.joinpath("qop.db"))
+    oids = oq.put_many([tasks.EchoTask('one'), tasks.EchoTask('two')], priority=2)
+    oids.insert(0, oq.put(tasks.EchoTask('zero'), 1))
+
+    assert oq.n_pending == 3
+    popped = [oq.pop() for i in range(3)]
+    assert [x.msg for x in popped] == ['zero', 'one', 'two']
+    assert [int(x.oid) for x in popped] == oids
+
+
+def test_TaskQueue_keeps_track_of_task_counts(tmp_path):
+    """TaskQueue keeps the counts of tasks per status up to date"""
+    oq = tasks.TaskQueue(path=tmp_path.joinpath("qop.db"))
+    oq.put_many([tasks.EchoTask('one'), tasks.EchoTask('two'), tasks.EchoTask('three')])
+    oq.put(tasks.EchoTask('one'))  # replaces the existing task
+    oq.put(tasks.EchoTask('child'), parent=1)
+
+    assert oq.n_total == 4
+    assert oq.n_pending == 4
+    assert oq.progress().pending == 3
+
+    tsk = oq.pop()
+    assert oq.n_pending == 3
+    assert oq.n_active == 1
+
+    oq.set_status(tsk.oid, Status.FAIL)
+    assert oq.n_active == 0
+    assert oq.n_fail == 1
+    assert oq.progress(include_children=True).to_dict() == {"total": 4, "pending": 3, "ok": 0, "fail": 1, "skip": 0, "active": 0}
+
+    # counts are rebuilt when the queue is reopened
+    assert tasks.TaskQueue(path=tmp_path.joinpath("qop.db")).progress(include_children=True).to_dict() == oq.progress(include_children=True).to_dict()
+
+    oq.flush(status=Status.PENDING)
+    assert oq.n_total == 1
+    oq.flush()
+    assert oq.n_total == 0
+
+
+def test_TaskQueue_archive(tmp_path):
+    """TaskQueue.archive() moves finished tasks without unfinished children out of the queue"""
+    oq = tasks.TaskQueue(path=tmp_path.joinpath("qop.db"))
+    parent, done, pending = oq.put_many([tasks.EchoTask('parent'), tasks.EchoTask('done'), tasks.EchoTask('pending')])
+    oq.put(tasks.EchoTask('child'), parent=parent)
+    oq.set_status(parent, Status.OK)
+    oq.set_status(done, Status.FAIL)
+
+    assert oq.archive() == 1
+    assert oq.n_total == 3
+    assert oq.con.execute("SELECT oid, status FROM tasks_archive").fetchall() == [(done, Status.FAIL)]
+
+    with pytest.raises(ValueError):
+        oq.archive(keep_last=-1)
+    assert oq.n_total == 3
+
+    oq.flush(status=Status.PENDING)
+    assert oq.archive(keep_last=1) == 0
+    assert oq.archive() == 1
+    assert oq.n_total == 0
+
+
 def test_TaskQueue_peek_does_not_modify_queue(tmp_path):
     """TaskQueue peek() behaves like pop() but without modifying the queue"""
     op1 = tasks.EchoTask('one')
@@ -346,14 +448,14 @@ def test_TaskQueue_peek_does_not_modify_queue(tmp_path):
     oq.put(op1, 1)
     oq.put(op3, 3)
 
+    meta = oq.peek_meta()
     o1 = oq.peek().__dict__
     o2 = oq.peek().__dict__
     o3 = oq.pop().__dict__
-    o3.__delitem__('oid')
-    o3['oid'] = None
 
     assert o1 == o2
     assert o1 == o3
+    assert meta == {"oid": o3["oid"], "type": TaskType.ECHO, "priority": 1, "status": Status.PENDING}
 
 
 def test_TaskQueue_fetch(tmp_path):
@@ -371,6 +473,10 @@ def test_TaskQueue_fetch(tmp_path):
     assert len(q.fetch(status=(Status.PENDING, Status.OK), n=3)) == 3
     assert len(q.fetch(status=None, n=None)) == 3
     assert len(q.fetch(status=(Status.PENDING,), n=None)) == 3
+    assert len(q.fetch(task_type=TaskType.DELETE)) == 2
+    assert len(q.fetch(status=Status.PENDING, task_type=TaskType.COPY, n=5)) == 1
+    assert [x["priority"] for x in q.fetch_iter()] == [10, 10, 10]
+    assert [x["type"] for x in q.fetch_meta(task_type=TaskType.DELETE)] == [TaskType.DELETE, TaskType.DELETE]
 
     q.start()
     sleep(0.5)
@@ -379,6 +485,14 @@ def test_TaskQueue_fetch(tmp_path):
     assert len(q.fetch(status=Status.OK, n=5)) == 3
 
 
+def test_TaskQueue_print(tmp_path, capsys):
+    """TaskQueue.print() prints the priority and description of queued tasks"""
+    q = tasks.TaskQueue(tmp_path.joinpath("qop.db"))
+    q.put(tasks.EchoTask("foo"), priority=3)
+    q.print()
+    assert capsys.readouterr().out.startswith("[3] ")
+
+
 def test_TaskQueue_runs_nonblocking(tmp_path):
     """Ensure processing of the queue happens in a background process and does not block the main process"""
     src = tmp_path.joinpath("foo")
@@ -397,3 +511,114 @@ def test_TaskQueue_runs_nonblocking(tmp_path):
     sleep(2)
     assert q.n_active == 0
 
+
+def test_TaskQueue_can_be_stopped_while_runners_are_idle(tmp_path):
+    """Terminating runners that wait for new tasks must not block later puts"""
+    q = tasks.TaskQueue(tmp_path.joinpath("qop.db"), max_transfer_processes=1, max_convert_processes=1)
+    q.put(tasks.SleepTask(30))
+    q.start()
+    sleep(2)  # the convert runner is now idle, waiting for convert tasks
+
+    def timeout(signum, frame):
+        raise TimeoutError("TaskQueue is deadlocked")
+
+    signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(10)
+    try:
+        q.stop()
+        q.put(tasks.EchoTask("foo"))
+    finally:
+        signal.alarm(0)
+    assert q.n_pending == 2
+
+
+def test_TaskQueue_can_be_used_after_a_runner_was_terminated_while_notifying(tmp_path):
+    """Runners wake each other whenever they complete a task; being terminated while doing so must not block others"""
+    q = tasks.TaskQueue(tmp_path.joinpath("qop.db"), max_transfer_processes=1, max_convert_processes=1)
+
+    def notify_forever():
+        while True:
+            q._notify_pending()
+
+    for _ in range(10):
+        p = multiprocessing.Process(target=notify_forever)
+        p.start()
+        sleep(0.1)
+        p.terminate()
+        p.join()
+
+    def timeout(signum, frame):
+        raise TimeoutError("TaskQueue is deadlocked")
+
+    signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(10)
+    try:
+        q.put(tasks.EchoTask("foo"))
+    finally:
+        signal.alarm(0)
+    assert q.n_pending == 1
+
+
+def test_TaskQueue_wakes_up_runners_at_most_once_each(tmp_path):
+    """Waking up runners must terminate even where BoundedSemaphore does not enforce its bound (e.g. macOS)"""
+    q = tasks.TaskQueue(tmp_path.joinpath("qop.db"), max_transfer_processes=2, max_convert_processes=1)
+    q._wakeup = multiprocessing.Semaphore(0)
+    q._notify_pending()
+    q._notify_pending()
+    assert q._wakeup.get_value() == 3
+
+
+def test_TaskQueue_runners_survive_if_failed_tasks_cannot_be_marked(tmp_path):
+    """A database error while marking a task as failed must not kill the runner and leave the task active"""
+    class LockedTaskQueue(tasks.TaskQueue):
+        n_locked = 0
+
+        def _complete(self, task, status, follow_up=None):
+            if status == Status.FAIL and self.n_locked < 2:
+                self.n_locked += 1
+                raise sqlite3.OperationalError("database is locked")
+            super()._complete(task, status, follow_up)
+
+    q = LockedTaskQueue(tmp_path.joinpath("qop.db"), max_transfer_processes=1, max_convert_processes=0)
+    q.put_many([tasks.FailTask(), tasks.EchoTask("foo")])
+    q.start()
+    wait_for_queue(q)
+    assert q.n_active == 0
+    assert q.n_fail == 1
+    assert q.n_ok == 1
+
+
+def test_TaskQueue_can_be_used_as_context_manager(tmp_path):
+    """TaskQueue closes its database connection when used as a context manager"""
+    with tasks.TaskQueue(tmp_path.joinpath("qop.db")) as q:
+        q.put(tasks.EchoTask("foo"))
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        q.n_total
+
+    with tasks.TaskQueue(tmp_path.joinpath("qop.db")) as q:
+        assert q.n_pending == 1
+
+
+def test_TaskQueue_migrates_queues_without_type_column(tmp_path):
+    """Queues created by older versions of qop get a type column, so that pop() can filter by task type"""
+    con = sqlite3.connect(tmp_path.joinpath("qop.db"))
+    con.execute("""
+        CREATE TABLE tasks (
+          priority INTEGER NOT NULL, task TEXT NOT NULL, status INTEGER NOT NULL, lock TEXT, parent INTEGER,
+          UNIQUE(task, status)
+        )
+    """)
+    con.execute("INSERT INTO tasks (priority, task, status) VALUES (10, ?, 0)", (tasks.SleepTask(0).to_json(),))
+    con.execute("INSERT INTO tasks (priority, task, status) VALUES (10, ?, 0)", (tasks.EchoTask("foo").to_json(),))
+    con.commit()
+    con.close()
+
+    with tasks.TaskQueue(tmp_path.joinpath("qop.db")) as q:
+        assert q.n_pending == 2
+        assert q.pop(task_type_include=TaskType.ECHO).msg == "foo"
+        assert isinstance(q.pop(task_type_exclude=TaskType.ECHO), tasks.SleepTask)
+
+    with tasks.TaskQueue(tmp_path.joinpath("qop.db")) as q:
+        assert q.con.execute("PRAGMA user_version").fetchone()[0] == tasks.SCHEMA_VERSION
+        assert q.n_active == 2
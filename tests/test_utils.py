@@ -1,3 +1,6 @@
+import os
+import shutil
+import pytest
 import pydub
 from pydub import generators
 from mediafile import MediaFile
@@ -23,3 +26,84 @@ def test_transfer_tags_between_different_filetypes(tmp_path):
     g = MediaFile(dst)
     assert g.artist == "foo"
     assert g.album == "bar"
+
+
+def test_files_identical(tmp_path):
+    a = tmp_path.joinpath("a")
+    b = tmp_path.joinpath("b")
+    a.write_bytes(b"foo" * 1000)
+    b.write_bytes(b"foo" * 1000)
+    assert _utils.files_identical(a, b, chunk_size=100)
+
+    b.write_bytes(b"foo" * 999 + b"bar")
+    assert not _utils.files_identical(a, b, chunk_size=100)
+
+    b.write_bytes(b"foo")
+    assert not _utils.files_identical(a, b)
+
+    # directories are never identical
+    assert not _utils.files_identical(tmp_path, tmp_path)
+
+
+def test_copy_file(tmp_path):
+    src = tmp_path.joinpath("src")
+    dst = tmp_path.joinpath("dst")
+    src.write_bytes(b"foo" * 100000)
+    src.chmod(0o600)
+    dst.write_bytes(b"a much longer file that should be overwritten" * 100000)
+
+    _utils.copy_file(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mode == src.stat().st_mode
+
+    _utils.copy_file(src, dst, preserve_stat=True)
+    assert dst.stat().st_mtime_ns == src.stat().st_mtime_ns
+
+
+def test_copy_file_refuses_to_copy_a_file_onto_itself(tmp_path):
+    src = tmp_path.joinpath("src")
+    src.write_bytes(b"foo")
+
+    with pytest.raises(shutil.SameFileError):
+        _utils.copy_file(src, src)
+    assert src.read_bytes() == b"foo"
+
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="os.copy_file_range() is not available")
+def test_copy_file_falls_back_if_copy_file_range_copies_nothing(tmp_path, monkeypatch):
+    src = tmp_path.joinpath("src")
+    dst = tmp_path.joinpath("dst")
+    src.write_bytes(b"foo" * 100000)
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0)
+
+    _utils.copy_file(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_resolve_file(tmp_path, monkeypatch):
+    tmp_path = tmp_path.resolve()
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("foo").mkdir()
+    tmp_path.joinpath("foo", "bar.txt").touch()
+    tmp_path.joinpath("link.txt").symlink_to(tmp_path.joinpath("foo", "bar.txt"))
+
+    assert _utils.resolve_file("foo/bar.txt") == tmp_path.joinpath("foo", "bar.txt")
+    assert _utils.resolve_file("foo/../foo/baz.txt") == tmp_path.joinpath("foo", "baz.txt")
+    assert _utils.resolve_file("link.txt") == tmp_path.joinpath("foo", "bar.txt")
+    assert _utils.resolve_file("foo/..") == tmp_path
+
+
+def test_purge_convert_cache_only_removes_stale_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(_utils.constants, "CONVERT_CACHE_DIR", tmp_path)
+    stale = tmp_path.joinpath("stale.mp3")
+    fresh = tmp_path.joinpath("fresh.mp3")
+    stale.touch()
+    fresh.touch()
+    os.utime(stale, (0, 0))
+
+    _utils.purge_convert_cache(min_age=3600)
+    assert not stale.exists()
+    assert fresh.exists()
+
+    _utils.purge_convert_cache()
+    assert not tmp_path.exists()